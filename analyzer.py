@@ -1,93 +1,200 @@
 import os
+import asyncio
+import collections
+import time
 import googleapiclient.discovery
 import logging
-import json
+import orjson
+import ijson
+import json5
 import re
 from crewai_tools import BaseTool
 from crewai import Agent, Task, Crew, Process
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
+from pydantic import BaseModel, ConfigDict, ValidationError, model_validator
+
+try:
+    import re2 as _re
+except ImportError:
+    _re = re
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Escape sequences left in comment text that need more than dropping the
+# backslash: unicode escapes are removed and control escapes become spaces.
+# The pattern has no backreferences, so RE2 can run it as a DFA when installed.
+_ESCAPE_RE = _re.compile(r'\\u[0-9A-Fa-f]{4}|\\U[0-9A-Fa-f]{8}|\\[ntr]')
+# Every other backslash and double quote is deleted in one C-level pass;
+# this also turns \' and \$ into ' and $.
+_DROP_TABLE = str.maketrans('', '', '"\\')
+# Stays on the stdlib engine: RE2's \s is ASCII-only.
+_WS_RE = re.compile(r'\s+')
+# Joins a page of comments for bulk cleaning. It is neither whitespace nor
+# touched by the patterns above, so no substitution can cross it.
+_COMMENT_SEPARATOR = '\x00'
+
+_VIDEO_ID_RE = re.compile(r"(?:v=|\/)([0-9A-Za-z_-]{11})")
+
+# Partial-response mask for commentThreads.list. Pages are chained through
+# opaque page tokens and cannot be fetched concurrently, so the cost of each
+# round-trip is cut by asking only for the fields that are actually read.
+_COMMENT_THREAD_FIELDS = "nextPageToken,items/snippet/topLevelComment/snippet/textDisplay"
+
+# llama3-8b-8192 shares one 8k-token window between prompt and answer. Each
+# chunk gets what is left after the fixed prompt (our instructions plus
+# CrewAI's scaffolding) and room for the answer, which quotes the comments.
+_MODEL_CONTEXT_TOKENS = 8192
+_PROMPT_TOKENS = 1024
+_OUTPUT_TOKENS = 4096
+
+# Crew runs started per minute across all analysis workers. The task has no
+# tools, so a run is normally a single Groq request; extra ReAct iterations
+# only happen when the agent's answer cannot be parsed.
+_MAX_RPM = 100
+
 class YouTubeCommentsTool(BaseTool):
     name: str = "YouTube Comments Fetcher"
     description: str = "Fetches all comments from a specified YouTube video using the YouTube Data API."
 
     def extract_video_id(self, url):
-        try:
-            match = re.search(r"(?:v=|\/)([0-9A-Za-z_-]{11}).*", url)
-            return match.group(1) if match else None
-        except Exception as e:
-            logging.error(f"Video ID extract error: {e}")
-            return None
+        match = _VIDEO_ID_RE.search(url)
+        return match.group(1) if match else None
 
-    def _run(self, video_url: str) -> list:
+    def _run(self, video_url: str) -> int:
         try:
             video_id = self.extract_video_id(video_url)
             if not video_id:
                 logging.error("Invalid YouTube URL provided.")
-                return []
+                return 0
 
             api_key = os.getenv("YOUTUBE_API_KEY")
             youtube = googleapiclient.discovery.build("youtube", "v3", developerKey=api_key)
 
-            comments = []
+            count = 0
             next_page_token = None
 
-            while True:
-                request = youtube.commentThreads().list(
-                    part="snippet",
-                    videoId=video_id,
-                    pageToken=next_page_token,
-                    maxResults=100,
-                    textFormat="plainText"
-                )
-                response = request.execute()
-
-                for item in response["items"]:
-                    comment = item["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
-                    comment = self.clean_escape_characters(comment)
-                    comments.append(comment)
-
-                next_page_token = response.get("nextPageToken")
-                if not next_page_token:
-                    break
-
-            self.save_comments_to_json(comments)
-            logging.info(f"A total of {len(comments)} comments were retrieved.")
-            return comments
+            # Each page is written out as it arrives instead of collecting the
+            # whole thread in memory first. The file is only read back by
+            # CommentsAnalysis, so it is written compactly, as orjson.dumps
+            # would write the whole list. It goes to a temporary file that
+            # only replaces comments.json once every page has been fetched,
+            # so a failed fetch never leaves a partial list that looks whole.
+            file_path = "comments.json"
+            tmp_path = file_path + ".tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(b"[")
+                    while True:
+                        request = youtube.commentThreads().list(
+                            part="snippet",
+                            videoId=video_id,
+                            pageToken=next_page_token,
+                            maxResults=100,
+                            textFormat="plainText",
+                            fields=_COMMENT_THREAD_FIELDS
+                        )
+                        response = request.execute()
+
+                        page = [
+                            item["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
+                            for item in response["items"]
+                        ]
+                        for comment in self.clean_comments(page):
+                            if count:
+                                f.write(b",")
+                            f.write(orjson.dumps(comment))
+                            count += 1
+
+                        next_page_token = response.get("nextPageToken")
+                        if not next_page_token:
+                            break
+                    f.write(b"]")
+                os.replace(tmp_path, file_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            logging.info("Comments have been saved to the JSON file.")
+            logging.info(f"A total of {count} comments were retrieved.")
+            return count
         
         except Exception as e:
             logging.error(f"An error occurred: {e}")
-            return []
+            return 0
 
     def clean_escape_characters(self, text):
         """Remove escape characters and unwanted characters from the given text."""
-        text = re.sub(r'\\u[0-9A-Fa-f]{4}', '', text)  # Unicode 
-        text = re.sub(r'\\U[0-9A-Fa-f]{8}', '', text)
-        text = re.sub(r'\\n', ' ', text)
-        text = re.sub(r'\\t', ' ', text)
-        text = re.sub(r'\\r', ' ', text)
-        text = re.sub(r'\\"', '', text) 
-        text = re.sub(r"\\'", "'", text)
-        text = re.sub(r'\\\$', '$', text)
-        text = re.sub(r'\\', '', text)
-        text = re.sub(r'\"', '', text) 
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
-
-    def save_comments_to_json(self, comments):
-        try:
-            file_path = "comments.json"
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(comments, f, ensure_ascii=False, indent=4)
-            logging.info("Comments have been saved to the JSON file.")
+        return self._clean_text(text).strip()
 
-        except Exception as e:
-            logging.error(f"Failed to save comments: {e}")
+    def clean_comments(self, comments):
+        """Clean a page of comments in one pass over their joined text."""
+        if not comments:
+            return []
+        if any(_COMMENT_SEPARATOR in comment for comment in comments):
+            return [self.clean_escape_characters(comment) for comment in comments]
+
+        text = self._clean_text(_COMMENT_SEPARATOR.join(comments))
+        return [comment.strip() for comment in text.split(_COMMENT_SEPARATOR)]
+
+    def _clean_text(self, text):
+        """Apply the escape, drop and whitespace passes, leaving the ends unstripped."""
+        text = _ESCAPE_RE.sub(lambda m: ' ' if m.group(0)[1] in 'ntr' else '', text)
+        text = text.translate(_DROP_TABLE)
+        return _WS_RE.sub(' ', text)
+
+class Insight(BaseModel):
+    comment: str
+    insight: str
+
+class CommentInsights(BaseModel):
+    """Schema every chunk's parsed analysis is validated against."""
+    model_config = ConfigDict(extra="forbid")
+
+    Requests: list[Insight] = []
+    Complaints: list[Insight] = []
+    Suggestions: list[Insight] = []
+    Praise: list[Insight] = []
+    Troubleshooting: list[Insight] = []
+    Other: list[Insight] = []
+
+    @model_validator(mode="before")
+    @classmethod
+    def fold_unknown_themes(cls, data):
+        """Moves insights under themes the model invented into "Other"."""
+        if not isinstance(data, dict):
+            return data
+        data = dict(data)
+        other = list(data.get("Other") or [])
+        for key in [key for key in data if key not in cls.model_fields]:
+            # Anything that is not a list of insights is left in place for
+            # extra="forbid" to reject.
+            if isinstance(data[key], list):
+                other.extend(data.pop(key))
+        data["Other"] = other
+        return data
+
+class RateLimiter:
+    """Lets at most max_calls start within any rolling window of period seconds."""
+
+    def __init__(self, max_calls, period=60.0):
+        self.max_calls = max_calls
+        self.period = period
+        self.calls = collections.deque()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            now = time.monotonic()
+            while self.calls and now - self.calls[0] >= self.period:
+                self.calls.popleft()
+            if len(self.calls) >= self.max_calls:
+                await asyncio.sleep(self.calls[0] + self.period - now)
+                self.calls.popleft()
+            self.calls.append(time.monotonic())
 
 class CommentsAnalysis:
     def __init__(self, comments_file_path):
@@ -98,35 +205,40 @@ class CommentsAnalysis:
             model_name="llama3-8b-8192"
         )
         self.results = []
-        self.raw_results_file_path = "raw_results.json"
+        self.comment_counts = collections.Counter()
+        self.raw_results_file_path = "raw_results.jsonl"
         self.final_results_file_path = "final_results.json"
-        self.initialize_results_file()
+        self.raw_results_fd = None
 
     def initialize_results_file(self):
         try:
-            with open(self.raw_results_file_path, "w", encoding="utf-8") as f:
-                json.dump([], f, ensure_ascii=False, indent=4)
+            # Opened at the start of each run and closed when it ends. With
+            # O_APPEND every os.write lands at the current end of the file, so
+            # workers can append without a lock.
+            self.raw_results_fd = os.open(
+                self.raw_results_file_path,
+                os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND,
+                0o644
+            )
             logging.info(f"The file {self.raw_results_file_path} has been created.")
         except Exception as e:
             logging.error(f"Failed to create file: {e}")
 
+    def close_results_file(self):
+        if self.raw_results_fd is not None:
+            os.close(self.raw_results_fd)
+            self.raw_results_fd = None
+
     def create_agent(self) -> Agent:
         return Agent(
             role="Tech Insights Analyst",
             goal=(
-                "Generate and synthesize insights from YouTube comments on tech videos. "
-                "Analyze the comments from {comments_chunk} ONLY to find meaningful patterns and synthesize data into insights that highlight the core message of viewer feedback."
-                "Results must be exactly in the JSON format. Do not include any extra comments, explanations, or notes beyond the analysis."
+                "Find meaningful patterns in YouTube comments on tech videos and synthesize them into "
+                "evidence-backed insights about viewer feedback, returned as JSON only."
             ),
             backstory=(
-                "You are a sharp-witted analyst with a passion for the tech sector. "
-                "Skilled in navigating through noise in the comments data of {comments_chunk} ONLY to find meaningful patterns, "
-                "you synthesize data into insights that highlight the core message of viewer feedback. "
-                "Your analytical prowess ensures that the subtleties of audience engagement and preferences are captured and understood, "
-                "setting the stage for informed content strategies. All your results should be grounded in evidence from the comments, so cite appropriately. "
-                "Do not include any extra comments, explanations, or notes beyond the analysis."
-                "Results must be exactly in the JSON format. Do not include any extra comments, explanations, or notes beyond the analysis."
-                "Don't add ``` after analysis"
+                "You are a sharp analyst of the tech sector who cuts through noisy comment sections. "
+                "Every conclusion you draw is grounded in the comments themselves, which you quote as evidence."
             ),
             llm=self.llm,
             allow_delegation=False,
@@ -135,37 +247,21 @@ class CommentsAnalysis:
         )
     
     def create_task(self, agent: Agent, comments_chunk, task_id) -> Task:
+        # The instructions come first and the comments last, so every chunk
+        # shares the same prompt prefix.
         return Task(
             description=(
-                "Analyze the comments you received and generate actionable insights for comments list {comments_chunk} ONLY. "
-                "Focus on identifying common themes such as viewer pain points, requests, what viewers loved, and popular tech queries in the comments. "
-                "For the requests or troubleshooting, please provide 'suggested' solutions that you might have to help me get going quicker. "
-                "Add textual citation. Don't add comment numbers just comments. By citations, I mean showing the comments that led to that conclusion to support the claim. "
-                "Categorize by themes like 'Requests', 'Complaints', 'Suggestions', 'Praise', 'Troubleshooting', and other relevant ones you find useful. "
-                "The output should be a JSON formatted dictionary of key insights, categorized by themes like 'Requests', 'Complaints', 'Suggestions', 'Praise', 'Troubleshooting'. "
-                "Each theme should contain an array of objects, each with a 'comment' and 'insight' field. "
-                "Ensure the JSON output is valid by strictly following JSON format rules, such as using double quotes for strings and proper escaping of special characters. "
-                "Check for missing commas, colons, and brackets to ensure the output is a valid JSON. "
-                "Do NOT include any extra comments, explanations, or notes beyond the analysis. "
-                "Do NOT include notes such as 'Note: The above output is a JSON formatted dictionary of key insights, categorized by themes like 'Requests', 'Complaints', 'Suggestions, and other relevant ones' "
-                "or 'Please let me know if this meets the expected criteria.' "
-                "Do NOT Say 'This is the final answer.' Do NOT include anything else. Just the insights. Output must be strictly a valid JSON formatted dictionary. "
-                "Remove escape characters from comments. Don't include any extra comments, explanations, or notes beyond the analysis. "
-                "Ensure that only the following categories are used: 'Requests', 'Complaints', 'Suggestions', 'Praise', 'Troubleshooting'. "
-                "If a comment does not fit into one of these categories, classify it as 'Other'. "
-                "Ensure the JSON output is valid, without trailing commas or syntax errors. Ensure proper escaping and use double quotes for strings."
-                "Don't mention that ```json to by the end of the task do not do that. Don't include any extra comments, explanations, or notes beyond the analysis. Don't include any comment numbers."
-                "Don't add ``` after analysis"
-                 "Results must be exactly in the JSON format. Do not include any extra comments, explanations, or notes beyond the analysis."
+                "Analyze the YouTube comments below and group actionable insights into these themes: "
+                "'Requests', 'Complaints', 'Suggestions', 'Praise', 'Troubleshooting', and 'Other' for anything else. "
+                "Look for viewer pain points, requests, what viewers loved and popular tech questions. "
+                "For requests and troubleshooting, include a suggested solution in the insight. "
+                "Cite the comment text that supports each insight, without comment numbers.\n\n"
+                "Comments: {comments_chunk}"
             ),
             agent=agent,
             expected_output=(
-                "A JSON formatted dictionary of key insights, categorized by themes like 'Requests', 'Complaints', 'Suggestions', 'Praise', 'Troubleshooting'. "
-                "Each theme should contain an array of objects, each with a 'comment' and 'insight' field. "
-                "Each result must be in exactly the same format. Do NOT ADD any other NOTES, COMMENTS, or EXPLANATIONS. Output must be strictly JSON formatted dictionary. "
-                "Do NOT Say 'This is the final answer.' Do NOT add any extra data to your results. Use double quotes for all strings. Don't include any comment numbers."
-                "Ensure the JSON output is valid, without trailing commas or syntax errors. Ensure proper escaping and use double quotes for strings."
-                 "Results must be exactly in the JSON format. Do not include any extra comments, explanations, or notes beyond the analysis."
+                "Only a valid JSON object, with no code fences, notes or other text. "
+                "Keys are the theme names; each value is an array of objects with a 'comment' and an 'insight' string."
             ),
             inputs={"comments_chunk": comments_chunk}
         )
@@ -177,49 +273,66 @@ class CommentsAnalysis:
             tasks=tasks,
             process=Process.sequential,
             verbose=2,
-            memory=False,
-            max_rpm=100
+            memory=False
         )
     
-    def split_comments(self, comments, chunk_size):
-        """Splits comments into chunks of a specified size."""
-        return [comments[i:i + chunk_size] for i in range(0, len(comments), chunk_size)]
+    def load_comments(self):
+        """Streams unique comments from the comments file, counting repeats as it goes."""
+        with open(self.comments_file_path, "rb") as f:
+            for comment in ijson.items(f, "item"):
+                self.comment_counts[comment] += 1
+                if self.comment_counts[comment] == 1:
+                    yield comment
+
+    def split_comments(self, comments, token_budget):
+        """Packs an iterable of comments into lists that fit within a token budget."""
+        chunk = []
+        chunk_tokens = 0
+        for comment in comments:
+            # English-like text runs about four characters per token, but CJK,
+            # emoji and other non-Latin scripts take a token or more per
+            # character, so their UTF-8 bytes are counted at two per token.
+            # Two more cover the quotes and separator around each list item.
+            ascii_chars = len(comment.encode("ascii", "ignore"))
+            other_bytes = len(comment.encode()) - ascii_chars
+            tokens = ascii_chars // 4 + other_bytes // 2 + 2
+            if chunk and chunk_tokens + tokens > token_budget:
+                yield chunk
+                chunk = []
+                chunk_tokens = 0
+            chunk.append(comment)
+            chunk_tokens += tokens
+        if chunk:
+            yield chunk
     
-    def append_result_to_json(self, result):
-        """Appends the result to the raw_results.json file."""
+    def append_result_to_json(self, task_id, result: dict):
+        """Appends a parsed result as one line to the raw_results.jsonl file."""
         try:
-            with open(self.raw_results_file_path, "r+", encoding="utf-8") as f:
-                results = json.load(f)
-                try:
-                    fixed_result = self.fix_trailing_commas(result)
-                    json_result = json.loads(fixed_result)
-                except json.JSONDecodeError as e:
-                    logging.error(f"JSON decode error: {e}")
-                    logging.error(f"Problematic result: {result}")
-                    return
-
-                results.append(json_result)
-
-                f.seek(0)
-                json.dump(results, f, ensure_ascii=False, indent=4)
-            logging.info("The result has been appended to the raw_results.json file.")
+            # Lines land in completion order; the task id lets merge_results
+            # restore chunk order.
+            entry = {"task_id": task_id, "result": result}
+            data = memoryview(orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE))
+            while data:
+                # os.write may write fewer bytes than asked; finish the line so
+                # the log never holds a partial record.
+                data = data[os.write(self.raw_results_fd, data):]
+            logging.info("The result has been appended to the raw_results.jsonl file.")
 
         except Exception as e:
             logging.error(f"Failed to append the result: {e}")
 
-    def fix_trailing_commas(self, json_str):
-        """Fix trailing commas in JSON string."""
-        json_str = re.sub(r',\s*]', ']', json_str)
-        json_str = re.sub(r',\s*}', '}', json_str)
-        return json_str
+    def parse_result(self, result):
+        """Parses an LLM result, accepting trailing commas and other JSON5 leniencies."""
+        try:
+            return orjson.loads(result)
+        except orjson.JSONDecodeError:
+            # Only malformed output pays for the pure-Python JSON5 parser.
+            return json5.loads(result)
 
     def merge_results(self):
         """Merges all comments into a single JSON structure."""
 
         try:
-            with open(self.raw_results_file_path, "r", encoding="utf-8") as f:
-                all_results = json.load(f)
-            
             final_results = {
                 "Requests": [],
                 "Complaints": [],
@@ -229,77 +342,123 @@ class CommentsAnalysis:
                 "Other": []
             }
             
-            for entry in all_results:
-                if isinstance(entry, dict):
-                    for key, value in entry.items():
-                        if key in final_results and isinstance(value, list):
-                            final_results[key].extend(value)
-                        else:
-                            final_results["Other"].extend(value)
-                else:
-                    logging.error(f"Unexpected entry type: {type(entry)} - {entry}")
-
-            with open(self.final_results_file_path, "w", encoding="utf-8") as f:
-                json.dump(final_results, f, ensure_ascii=False, indent=4)
+            with open(self.raw_results_file_path, "rb") as f:
+                entries = [orjson.loads(line) for line in f if line.strip()]
+
+            # Workers append in completion order, so sort back into chunk order
+            # to keep final_results.json stable between runs.
+            entries.sort(key=lambda entry: entry["task_id"])
+            for entry in entries:
+                # Results were validated against CommentInsights before they
+                # were logged, so every key is a known theme.
+                for key, value in entry["result"].items():
+                    final_results[key].extend(value)
+
+            for insights in final_results.values():
+                for insight in insights:
+                    if isinstance(insight, dict) and isinstance(insight.get("comment"), str):
+                        count = self.comment_counts.get(insight["comment"], 1)
+                        if count > 1:
+                            insight["count"] = count
+
+            with open(self.final_results_file_path, "wb") as f:
+                f.write(orjson.dumps(final_results, option=orjson.OPT_INDENT_2))
             
             logging.info(f"All results have been merged into the {self.final_results_file_path} file.")
 
         except Exception as e:
             logging.error(f"Failed to merge results: {e}")
 
-    def run(self):
+    async def analyze_chunk(self, rate_limiter, chunk, task_id):
+        """Runs the crew for one chunk in a worker thread and returns its parsed output."""
+        try:
+            # A fresh agent per chunk: CrewAI keeps retry counts on the agent
+            # and never resets them between tasks.
+            agent = self.create_agent()
+            task = self.create_task(agent, chunk, task_id)
+            crew = self.create_crew(agent, [task])
+
+            await rate_limiter.acquire()
+            result = await asyncio.to_thread(crew.kickoff, inputs={"comments_chunk": chunk})
+        except Exception as e:
+            logging.error(f"Task {task_id} failed: {e}")
+            return None
+
+        logging.debug(f"Result type: {type(result)}")
+        logging.debug(f"Result content: {result}")
+
+        # Parsed and validated here rather than through the task's
+        # output_json: CrewAI's converter retries malformed output with extra
+        # LLM calls and can still hand back an unvalidated dict.
+        raw_result = result if isinstance(result, str) else result.raw
+        logging.info(f"Task {task_id} raw result: {raw_result}")
+        try:
+            return CommentInsights.model_validate(self.parse_result(raw_result)).model_dump()
+        except ValidationError as e:
+            logging.error(f"Task {task_id} result does not match the expected themes: {e}")
+            logging.error(f"Problematic result: {raw_result}")
+            return None
+        except ValueError as e:
+            logging.error(f"JSON decode error: {e}")
+            logging.error(f"Problematic result: {raw_result}")
+            return None
+
+    async def run_async(self, concurrency=8):
         try:
             if not os.path.exists(self.comments_file_path):
                 raise FileNotFoundError(f"Comments file not found: {self.comments_file_path}")
-            
-            with open(self.comments_file_path, 'r', encoding='utf-8') as file:
-                comments_data = json.load(file)
-            
-            if comments_data is None:
-                logging.error("Failed to load comments data.")
+
+            self.initialize_results_file()
+            if self.raw_results_fd is None:
                 return
-            
-            chunk_size = 20
-            comments_chunks = self.split_comments(comments_data, chunk_size)
-            
-            logging.info(f"Loaded comments: {comments_data[:5]}")
-            
-            for idx, chunk in enumerate(comments_chunks):
-                agent = self.create_agent()
-                task = self.create_task(agent, chunk, idx + 1)
-                crew = self.create_crew(agent, [task])
-                
-                result = crew.kickoff(inputs={"comments_chunk": chunk})
-                
-                logging.debug(f"Result type: {type(result)}")
-                logging.debug(f"Result content: {result}")
-
-                if isinstance(result, str):
-                    fixed_result = self.fix_trailing_commas(result)
-                else:
-                    fixed_result = self.fix_trailing_commas(str(result))  # or result.get_output() if such a method exists
-
-                logging.info(f"Task {idx + 1} raw result: {fixed_result}")
-                
-                try:
-                    json_result = json.loads(fixed_result)
-                    self.append_result_to_json(fixed_result)
-                except json.JSONDecodeError as e:
-                    logging.error(f"JSON decode error after validation: {e}")
-                    logging.error(f"Problematic result: {fixed_result}")
-                
-                logging.info(f"Task {idx + 1} output: {fixed_result}")
+
+            # Identical comments (spam, "First!") would otherwise be sent to
+            # the LLM again; load_comments keeps the first occurrence of each
+            # and counts the rest so the merged insights can report them.
+            self.comment_counts = collections.Counter()
+
+            token_budget = _MODEL_CONTEXT_TOKENS - _PROMPT_TOKENS - _OUTPUT_TOKENS
+            comments_chunks = enumerate(self.split_comments(self.load_comments(), token_budget))
+
+            # Chunks are independent, so their LLM calls overlap. A fixed pool
+            # of workers pulls chunks from the stream only as it has room for
+            # them. Every crew run first waits on one limiter shared by all
+            # workers, so the pool starts at most _MAX_RPM runs per minute
+            # however many workers there are.
+            # Results are appended as soon as each chunk finishes.
+            rate_limiter = RateLimiter(_MAX_RPM)
+
+            async def worker():
+                for idx, chunk in comments_chunks:
+                    result = await self.analyze_chunk(rate_limiter, chunk, idx + 1)
+                    if result is None:
+                        continue
+
+                    self.append_result_to_json(idx + 1, result)
+                    logging.info(f"Task {idx + 1} output: {result}")
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+            total = sum(self.comment_counts.values())
+            logging.info(f"Loaded {total} comments, skipped {total - len(self.comment_counts)} duplicates.")
 
             self.merge_results()
 
         except Exception as e:
             logging.error(f"An error occurred: {e}")
 
+        finally:
+            self.close_results_file()
+
+    def run(self, concurrency=8):
+        asyncio.run(self.run_async(concurrency))
+
 if __name__ == "__main__":
     yt_tool = YouTubeCommentsTool()
     video_url = input("🚀 Enter YouTube URL: ")
-    yt_tool._run(video_url)
-
-    comments_file_path = "comments.json"
-    comments_analysis = CommentsAnalysis(comments_file_path)
-    comments_analysis.run()
+    if yt_tool._run(video_url):
+        comments_file_path = "comments.json"
+        comments_analysis = CommentsAnalysis(comments_file_path)
+        comments_analysis.run()
+    else:
+        logging.error("No comments were fetched; skipping the analysis.")